@@ -0,0 +1,92 @@
+"""
+Compares status-read latency and backend load for the MongoDB and Redis result backends,
+plus the extra cost of a miss in dual mode (Redis first, then MongoDB).
+
+    sysenv=dev RESULT_REDIS_URL=redis://localhost:6379/1 python benchmarks/result_backend.py [reads]
+
+Both backends must be reachable. Results are seeded with store_result, then read back the
+way the API does on an uncached status poll (state, then get() when ready). The dual mode
+miss goes through celeryconfig.get_async_result, the same lookup the API uses.
+"""
+import os
+import statistics
+import sys
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def _app(mode):
+    from celery import Celery
+
+    from celeryconfig import CeleryConfig
+    from settings import config_by_name
+
+    settings = config_by_name[os.getenv('sysenv', 'dev')]()
+    settings.RESULT_BACKEND = mode
+    app = Celery(set_as_current=False)
+    app.config_from_object(CeleryConfig(settings))
+    return app
+
+
+def _redis_commands(app):
+    return app.backend.client.info('stats')['total_commands_processed']
+
+
+def _mongo_ops(app):
+    counters = app.backend.database.client.admin.command('serverStatus')['opcounters']
+    return sum(counters.values())
+
+
+def _read(app, jid):
+    return _poll(app.AsyncResult(jid))
+
+
+def _poll(result):
+    if result.ready():
+        result.get()
+    return result.state
+
+
+def _timed(reads, fn):
+    samples = []
+    for _ in range(reads):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _report(name, samples, ops):
+    samples = sorted(samples)
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    print(f'{name:<24} p50 {statistics.median(samples) * 1000:7.3f} ms   p99 {p99 * 1000:7.3f} ms   '
+          f'backend ops/read {ops / len(samples):5.2f}')
+
+
+def main(reads):
+    payload = {'id': 'benchmark', 'candidate': 'https://example.com', 'confidence': 0.5}
+    for mode, load in (('mongodb', _mongo_ops), ('redis', _redis_commands)):
+        app = _app(mode)
+        jid = str(uuid.uuid4())
+        app.backend.store_result(jid, payload, 'SUCCESS')
+        before = load(app)
+        samples = _timed(reads, lambda: _read(app, jid))
+        _report(mode, samples, load(app) - before)
+
+    # A dual mode miss: unknown to Redis, answered by MongoDB.
+    os.environ['RESULT_BACKEND'] = 'dual'
+    from celeryconfig import get_async_result, get_celery
+
+    dual, mongo = get_celery(), _app('mongodb')
+    jid = str(uuid.uuid4())
+    mongo.backend.store_result(jid, payload, 'SUCCESS')
+    before = _redis_commands(dual) + _mongo_ops(mongo)
+    samples = _timed(reads, lambda: _poll(get_async_result(jid)))
+    _report('dual (fallback)', samples, _redis_commands(dual) + _mongo_ops(mongo) - before)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,96 @@
+"""
+Measures cold import/app-creation time and worker spawn time, to track the cost uWSGI pays
+whenever the cheaper algorithm brings up a worker.
+
+    sysenv=test python benchmarks/startup.py [runs]
+
+- import: fresh interpreter importing the app package and calling create_app
+- warm_up: extra time spent in warm_up() (paid once in the uWSGI master)
+- spawn (cold/warm): fork from a parent that did or did not warm up, then time the child
+  until it has everything a scan request needs loaded
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+IMPORT_SNIPPET = '''
+import time
+start = time.perf_counter()
+from service.rest import create_app
+from settings import config_by_name
+create_app(config_by_name['test']())
+created = time.perf_counter()
+from service.rest import warm_up
+app = create_app(config_by_name['test']())
+warmed = time.perf_counter()
+warm_up(app)
+print(created - start, time.perf_counter() - warmed)
+'''
+
+
+def _import_times(runs):
+    imports, warm_ups = [], []
+    for _ in range(runs):
+        out = subprocess.check_output([sys.executable, '-c', IMPORT_SNIPPET], cwd=ROOT,
+                                      env=dict(os.environ, sysenv='test'))
+        created, warmed = out.split()
+        imports.append(float(created))
+        warm_ups.append(float(warmed))
+    return imports, warm_ups
+
+
+def _spawn_time(app, warm):
+    from service.rest import reset_after_fork, warm_up
+
+    read_fd, write_fd = os.pipe()
+    start = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        reset_after_fork(app)
+        if not warm:
+            warm_up(app)
+        os.write(write_fd, b'x')
+        os._exit(0)
+    os.close(write_fd)
+    os.read(read_fd, 1)
+    elapsed = time.perf_counter() - start
+    os.waitpid(pid, 0)
+    os.close(read_fd)
+    return elapsed
+
+
+def _report(name, samples):
+    print(f'{name:<14} median {statistics.median(samples) * 1000:8.2f} ms   '
+          f'max {max(samples) * 1000:8.2f} ms')
+
+
+def main(runs):
+    os.environ.setdefault('sysenv', 'test')
+    imports, warm_ups = _import_times(runs)
+    _report('import', imports)
+    _report('warm_up', warm_ups)
+
+    # Cold spawn must run before anything in this process warms up.
+    cold = [_spawn_time(_app(), warm=False) for _ in range(runs)]
+    app = _app()
+    from service.rest import warm_up
+    warm_up(app)
+    warm = [_spawn_time(app, warm=True) for _ in range(runs)]
+    _report('spawn (cold)', cold)
+    _report('spawn (warm)', warm)
+
+
+def _app():
+    from service.rest import create_app
+    from settings import config_by_name
+    return create_app(config_by_name['test']())
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
@@ -1,12 +1,14 @@
 import os
 
-from celery import Celery
-from kombu import Exchange, Queue
-
 from settings import AppConfig, config_by_name
 
-config = config_by_name[os.getenv('sysenv', 'dev')]()
+RESULT_BACKEND_MONGODB = 'mongodb'
+RESULT_BACKEND_REDIS = 'redis'
+RESULT_BACKEND_DUAL = 'dual'
+TASK_PUBLISH_OUTBOX = 'outbox'
+
 __celery = None
+__fallback_backend = None
 
 
 class CeleryConfig:
@@ -24,6 +26,8 @@ class CeleryConfig:
 
     @staticmethod
     def _getqueues(env, queue_args):
+        from kombu import Exchange, Queue
+
         queue_modifier = ''
         exchange = 'classifier'
         if env != 'prod':
@@ -38,6 +42,8 @@ class CeleryConfig:
 
     @staticmethod
     def _getroutes(env, queue_args):
+        from kombu import Exchange, Queue
+
         queue_modifier = ''
         if env != 'prod':
             queue_modifier = env
@@ -52,12 +58,24 @@ class CeleryConfig:
 
     def __init__(self, settings: AppConfig):
         self.broker_url = os.getenv('MULTIPLE_BROKERS')
+        if settings.TASK_PUBLISH_MODE == TASK_PUBLISH_OUTBOX:
+            # Publishing happens off the request path, so wait for the broker to confirm it
+            self.broker_transport_options = {'confirm_publish': True}
 
-        self.result_backend = settings.DBURL
+        self.result_backend_mode = settings.RESULT_BACKEND
+        if self.result_backend_mode in (RESULT_BACKEND_REDIS, RESULT_BACKEND_DUAL):
+            self.result_backend = settings.RESULT_REDIS_URL
+        else:
+            self.result_backend = settings.DBURL
+        # Only honoured where results are written and cleaned up: the classifier/scanner workers
+        # set the Redis TTL and celery beat purges MongoDB. Those must run with the same value.
+        self.result_expires = settings.RESULT_EXPIRES
+        # Kept in every mode so the dual mode fallback can still read old results
         self.mongodb_backend_settings = {
             'database': settings.DB,
             'taskmeta_collection': 'classifier-celery'
         }
+        self.mongodb_url = settings.DBURL
         env = os.getenv('sysenv', 'dev')
 
         queue_args = {'x-queue-type': 'quorum'}
@@ -65,9 +83,45 @@ class CeleryConfig:
         self.task_routes = CeleryConfig._getroutes(env, queue_args)
 
 
-def get_celery() -> Celery:
+def get_celery():
+    """
+    Build the Celery app on first use. Celery, kombu and the environment config are only
+    imported/constructed here so importing this module stays cheap.
+    """
     global __celery
     if not __celery:
+        from celery import Celery
+
         __celery = Celery()
-        __celery.config_from_object(CeleryConfig(config))
+        __celery.config_from_object(CeleryConfig(config_by_name[os.getenv('sysenv', 'dev')]()))
     return __celery
+
+
+def get_async_result(jid):
+    """
+    Look up a task result. In dual result-backend mode a result unknown to Redis is looked
+    up in MongoDB too, so results written before the migration stay readable until they age out.
+    """
+    global __fallback_backend
+    celery = get_celery()
+    result = celery.AsyncResult(jid)
+    if celery.conf.result_backend_mode != RESULT_BACKEND_DUAL or result.state != 'PENDING':
+        return result
+
+    if not __fallback_backend:
+        from celery.backends.mongodb import MongoBackend
+
+        __fallback_backend = MongoBackend(app=celery, url=celery.conf.mongodb_url)
+    fallback = celery.AsyncResult(jid, backend=__fallback_backend)
+    return fallback if fallback.state != 'PENDING' else result
+
+
+def reset_celery_after_fork():
+    """
+    Forget broker connections/producer pools inherited from the parent process so a forked
+    worker opens its own. Celery only wires this up for multiprocessing forks, not uWSGI's.
+    """
+    global __fallback_backend
+    __fallback_backend = None
+    if __celery:
+        __celery._after_fork()
@@ -0,0 +1,53 @@
+"""
+Background work of a pod, run by the single uWSGI mule declared in uwsgi.ini rather than by
+every worker: refreshing the /classify/metrics snapshot every METRICS_REFRESH_INTERVAL seconds
+and, with TASK_PUBLISH_MODE=outbox, publishing the spooled tasks.
+"""
+import logging
+import os
+import time
+
+from celeryconfig import TASK_PUBLISH_OUTBOX, reset_celery_after_fork
+from service.cache.redis_cache import RedisCache
+from service.outbox import TaskOutbox
+from service.rest.metrics import MetricsCollector
+from service.rest.verdicts import VerdictStore
+from settings import config_by_name
+
+_logger = logging.getLogger(__name__)
+
+
+def _run(work, description):
+    try:
+        return work()
+    except Exception as e:
+        _logger.error('Error in {}: {}'.format(description, e))
+        return None
+
+
+def main():
+    config = config_by_name[os.getenv('sysenv', 'dev')]()
+    cache = RedisCache(config.CACHE_SERVICE, replica_reads=config.CACHE_REPLICA_READS,
+                       connect_timeout=config.CACHE_CONNECT_TIMEOUT, socket_timeout=config.CACHE_SOCKET_TIMEOUT)
+    verdicts = VerdictStore(cache, config.VERDICT_REUSE, max_age=config.VERDICT_MAX_AGE)
+    metrics = MetricsCollector(cache, verdicts=verdicts, refresh_interval=config.METRICS_REFRESH_INTERVAL)
+    outbox = TaskOutbox(cache) if config.TASK_PUBLISH_MODE == TASK_PUBLISH_OUTBOX else None
+
+    # The mule is forked from the master, so drop its broker connections like a worker does
+    reset_celery_after_fork()
+    next_refresh = 0
+    while True:
+        if time.time() >= next_refresh:
+            next_refresh = time.time() + metrics.refresh_interval
+            _run(metrics.refresh, 'refreshing metrics')
+        if outbox:
+            # drain() waits for new entries itself, so the loop only backs off on errors
+            if _run(outbox.drain, 'draining the task outbox') is None:
+                time.sleep(1)
+        else:
+            time.sleep(max(next_refresh - time.time(), 0))
+
+
+# uWSGI runs a mule script as __main__
+if __name__ == '__main__':
+    main()
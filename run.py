@@ -1,10 +1,28 @@
 import os
 
-from service.rest import create_app
+from service.log_utils import start_async_logging
+from service.rest import create_app, reset_after_fork, warm_up
 from settings import config_by_name
 
 config = config_by_name[os.getenv('sysenv', 'dev')]()
 app = create_app(config)
 
+# uWSGI loads this file once in the master (lazy-apps is off), so warm-up cost is paid
+# before the cheaper algorithm forks workers rather than by each new worker.
+warm_up(app)
+
+
+def post_fork():
+    reset_after_fork(app)
+    start_async_logging()
+
+
+try:
+    from uwsgidecorators import postfork
+except ImportError:  # Not running under uWSGI
+    pass
+else:
+    postfork(post_fork)
+
 if __name__ == '__main__':
     app.run()
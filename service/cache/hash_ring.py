@@ -0,0 +1,47 @@
+import bisect
+import hashlib
+
+
+class HashRing(object):
+    """
+    Consistent hash ring used to place cache keys on nodes. Adding or removing a node only
+    moves the keys that hashed to it. As in Redis Cluster, when a key contains a non-empty
+    ``{tag}`` only the tag is hashed, so related keys can be forced onto the same node.
+    """
+
+    def __init__(self, nodes, replicas=160):
+        self._ring = []
+        self._nodes = {}
+        for node in nodes:
+            for i in range(replicas):
+                point = self._hash('{}#{}'.format(node, i))
+                self._nodes[point] = node
+                self._ring.append(point)
+        self._ring.sort()
+
+    @staticmethod
+    def _hash(value):
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        return int.from_bytes(hashlib.md5(value).digest()[:8], 'big')
+
+    @staticmethod
+    def hash_tag(key):
+        """
+        Return the part of key that decides its placement
+        """
+        if isinstance(key, bytes):
+            key = key.decode('utf-8', 'replace')
+        start = key.find('{')
+        if start != -1:
+            end = key.find('}', start + 1)
+            if end > start + 1:
+                return key[start + 1:end]
+        return key
+
+    def get_node(self, key):
+        """
+        Return the node owning key
+        """
+        index = bisect.bisect(self._ring, self._hash(self.hash_tag(key))) % len(self._ring)
+        return self._nodes[self._ring[index]]
@@ -17,3 +17,36 @@ class Cache(metaclass=ABCMeta):
         """
         Get the data associated with key from the cache
         """
+
+    @abstractmethod
+    def add_many(self, mapping, ttl=86400, overwrite=True):
+        """
+        Add every key/data pair in mapping to the cache for the given TTL (seconds).
+        Keys that already exist are left untouched unless overwrite is set.
+        """
+
+    @abstractmethod
+    def get_many(self, keys):
+        """
+        Get the data associated with each key, in the same order as keys (None when missing)
+        """
+
+    @abstractmethod
+    def add_fields(self, key, mapping, ttl=86400, replace=True):
+        """
+        Store mapping as individually readable fields under key for the given TTL (seconds).
+        Fields already stored under key are kept, unless overwritten, when replace is False.
+        """
+
+    @abstractmethod
+    def get_fields(self, key, fields=None):
+        """
+        Get the stored fields under key (all of them when fields is None) as a dict. Returns
+        None if key holds a value that is not a set of fields.
+        """
+
+    @abstractmethod
+    def increment(self, key, amount=1):
+        """
+        Increment the counter stored under key
+        """
@@ -1,29 +1,156 @@
 import logging
+from collections import OrderedDict
+from itertools import cycle
 
-from redis import Redis
-
+from .hash_ring import HashRing
 from .interface.cache import Cache
 
 
 class RedisCache(Cache):
+    """
+    Cache spread over one or more Redis nodes.
+
+    connection_str is a comma separated list of nodes. Each node is a primary host[:port],
+    optionally followed by |-separated read replicas, e.g. 'cache-0|cache-0-ro,cache-1'.
+    A single host behaves exactly like a plain Redis connection. Keys are placed on nodes
+    with a consistent hash ring, and reads go to a replica when replica_reads is enabled.
+    client_factory builds the client for a host; it defaults to a redis.Redis connection with
+    the given connect and read timeouts (seconds), which keep an unresponsive replica from
+    stalling reads before they fall back to the primary.
+    """
 
-    def __init__(self, connection_str):
+    def __init__(self, connection_str, replica_reads=False, connect_timeout=None, socket_timeout=None,
+                 client_factory=None):
         self._logger = logging.getLogger(__name__)
-        try:
-            self._redis = Redis(connection_str)
-        except Exception as e:
-            self._logger.fatal('Error in creating redis connection: {}'.format(e))
+        self._replicas = OrderedDict()
+        for node in connection_str.split(','):
+            hosts = [host.strip() for host in node.split('|') if host.strip()]
+            if hosts:
+                self._replicas[hosts[0]] = hosts[1:]
+        self._ring = HashRing(self._replicas)
+        self._replica_reads = replica_reads
+        self._next_replica = {primary: cycle(replicas) for primary, replicas in self._replicas.items() if replicas}
+        self._connect_timeout = connect_timeout
+        self._socket_timeout = socket_timeout
+        self._client_factory = self._connect if client_factory is None else client_factory
+        self._clients = {}
+
+    @property
+    def hosts(self):
+        """
+        Every primary and replica host this cache talks to
+        """
+        return [host for primary, replicas in self._replicas.items() for host in [primary] + replicas]
+
+    def _connect(self, host):
+        from redis import Redis
+
+        name, _, port = host.partition(':')
+        return Redis(name, int(port or 6379), socket_connect_timeout=self._connect_timeout,
+                     socket_timeout=self._socket_timeout)
+
+    def _client(self, host):
+        # Built on first use so app creation (and the uWSGI master) never touches Redis.
+        if host not in self._clients:
+            try:
+                self._clients[host] = self._client_factory(host)
+            except Exception as e:
+                self._logger.fatal('Error in creating redis connection: {}'.format(e))
+                return None
+        return self._clients[host]
+
+    def _read(self, primary, command, *args):
+        # Replica reads fall back to the primary if the replica is unavailable.
+        if self._replica_reads and primary in self._next_replica:
+            try:
+                return getattr(self._client(next(self._next_replica[primary])), command)(*args)
+            except Exception:
+                pass
+        return getattr(self._client(primary), command)(*args)
+
+    def _group_by_node(self, keys):
+        groups = OrderedDict()
+        for key in keys:
+            groups.setdefault(self._ring.get_node(key), []).append(key)
+        return groups
+
+    def client_for(self, key):
+        """
+        Raw client of the primary node owning key, for data structures this class does not wrap
+        """
+        return self._client(self._ring.get_node(key))
+
+    def reset_after_fork(self):
+        """
+        Drop pooled connections inherited from a parent process without closing them, so the
+        parent's sockets are left alone and this process reconnects on next use.
+        """
+        for client in self._clients.values():
+            pool = getattr(client, 'connection_pool', None)
+            if pool is not None:
+                pool.reset()
 
     def get(self, redis_key):
         try:
-            redis_value = self._redis.get(redis_key)
+            redis_value = self._read(self._ring.get_node(redis_key), 'get', redis_key)
         except Exception:
             redis_value = None
         return redis_value
 
     def add(self, key, data, ttl=86400):
         try:
-            self._redis.set(key, data)
-            self._redis.expire(key, ttl)
+            client = self._client(self._ring.get_node(key))
+            client.set(key, data)
+            client.expire(key, ttl)
         except Exception as e:
             self._logger.error("Error in setting the redis value for {} : {}".format(key, e))
+
+    def get_many(self, keys):
+        values = {}
+        for primary, node_keys in self._group_by_node(keys).items():
+            try:
+                node_values = self._read(primary, 'mget', node_keys)
+            except Exception:
+                node_values = []
+            values.update(zip(node_keys, node_values))
+        return [values.get(key) for key in keys]
+
+    def add_many(self, mapping, ttl=86400, overwrite=True):
+        for primary, node_keys in self._group_by_node(mapping).items():
+            try:
+                pipe = self._client(primary).pipeline(transaction=False)
+                for key in node_keys:
+                    pipe.set(key, mapping[key], ex=ttl, nx=not overwrite)
+                pipe.execute()
+            except Exception as e:
+                self._logger.error("Error in setting the redis values on {} : {}".format(primary, e))
+
+    def add_fields(self, key, mapping, ttl=86400, replace=True):
+        try:
+            pipe = self._client(self._ring.get_node(key)).pipeline(transaction=False)
+            if replace:
+                pipe.delete(key)
+            pipe.hset(key, mapping=mapping)
+            pipe.expire(key, ttl)
+            pipe.execute()
+        except Exception as e:
+            self._logger.error("Error in setting the redis fields for {} : {}".format(key, e))
+
+    def get_fields(self, key, fields=None):
+        try:
+            primary = self._ring.get_node(key)
+            if fields is None:
+                values = self._read(primary, 'hgetall', key)
+            else:
+                fields = list(fields)
+                values = dict(zip(fields, self._read(primary, 'hmget', key, fields)))
+        except Exception as e:
+            return None if 'WRONGTYPE' in str(e) else {}
+        return {field.decode() if isinstance(field, bytes) else field: value
+                for field, value in values.items() if value is not None}
+
+    def increment(self, key, amount=1):
+        try:
+            self._client(self._ring.get_node(key)).incr(key, amount)
+        except Exception as e:
+            self._logger.error("Error in incrementing the redis counter {} : {}".format(key, e))
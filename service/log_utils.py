@@ -0,0 +1,98 @@
+import atexit
+import json
+import logging
+import os
+import random
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+
+__listener = None
+__listener_pid = None
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Hands records to the background listener without formatting them first, so building
+    the message and writing it out both happen off the request thread. Anything passed as a
+    log argument through this handler must not be mutated after the logging call.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class TruncatedPayload(object):
+    """
+    Log argument that serialises (and truncates) a payload only if the record is emitted
+    """
+    __slots__ = ('_payload', '_max_chars')
+
+    def __init__(self, payload, max_chars):
+        self._payload = payload
+        self._max_chars = max_chars
+
+    def __str__(self):
+        try:
+            text = json.dumps(self._payload, default=str)
+        except (TypeError, ValueError):
+            text = str(self._payload)
+        if self._max_chars and len(text) > self._max_chars:
+            return '{}... ({} chars truncated)'.format(text[:self._max_chars], len(text) - self._max_chars)
+        return text
+
+
+def log_payload(logger, message, payload, sample_rate=1.0, max_chars=1024):
+    """
+    Log a request payload at INFO for roughly sample_rate of the calls. message takes a
+    single %s for the payload, which is also attached to the record as a 'payload' field.
+    """
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    if sample_rate < 1.0 and random.random() >= sample_rate:
+        return
+    lazy_payload = TruncatedPayload(payload, max_chars)
+    logger.info(message, lazy_payload, extra={'payload': lazy_payload})
+
+
+def start_async_logging(logger=None):
+    """
+    Move the handlers of logger (root by default) behind an in-memory queue drained by a
+    background thread. Threads do not survive a fork, so call this in each uWSGI worker
+    after it is forked; repeated calls in the same process are ignored.
+    """
+    global __listener, __listener_pid
+    if __listener_pid == os.getpid():
+        return
+    logger = logger or logging.getLogger()
+    # A listener inherited from the parent process has no thread here; take over its handlers.
+    handlers = list(__listener.handlers) if __listener else list(logger.handlers)
+    if not handlers:
+        return
+
+    log_queue = SimpleQueue()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(DeferredQueueHandler(log_queue))
+    __listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    __listener.start()
+    __listener_pid = os.getpid()
+    atexit.register(stop_async_logging)
+
+
+def stop_async_logging(logger=None):
+    """
+    Flush and stop the background log listener of this process, if any, and hand its
+    handlers back to logger (root by default)
+    """
+    global __listener, __listener_pid
+    if not __listener:
+        return
+    if __listener_pid == os.getpid():
+        __listener.stop()
+    logger = logger or logging.getLogger()
+    for handler in list(logger.handlers):
+        if isinstance(handler, DeferredQueueHandler):
+            logger.removeHandler(handler)
+    for handler in __listener.handlers:
+        logger.addHandler(handler)
+    __listener = __listener_pid = None
@@ -0,0 +1,159 @@
+import json
+import logging
+import os
+import socket
+import uuid
+
+from celeryconfig import get_celery
+
+OUTBOX_STREAM = 'outbox:tasks'
+OUTBOX_GROUP = 'publishers'
+# Entries that failed to publish max_deliveries times are moved here for inspection
+OUTBOX_DEAD_LETTER_STREAM = 'outbox:dead'
+
+# Passed to send_task so a failing broker is retried against the next one in MULTIPLE_BROKERS
+PUBLISH_RETRY_POLICY = {
+    'max_retries': 3,
+    'interval_start': 0,
+    'interval_step': 0.5,
+    'interval_max': 2
+}
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class TaskOutbox(object):
+    """
+    Durable spool for task publishing. enqueue() commits the route, payload and a pre-assigned
+    task id to a REDIS stream and returns straight away. drain() is run in a loop by the single
+    uWSGI mule of each pod (see mule.py) and publishes the stream in batches through a consumer
+    group, so every entry is published by one pod; entries are only acknowledged once the broker
+    confirmed them, and entries left unacknowledged by a failed or dead publisher are reclaimed
+    after reclaim_after_ms, up to max_deliveries times before they are dead-lettered. Both
+    streams are capped at roughly max_len entries. The REDIS node holding the stream must
+    persist writes, see check_durable().
+    """
+
+    def __init__(self, cache, batch_size=50, block_ms=1000, reclaim_after_ms=60000, max_deliveries=5,
+                 max_len=100000):
+        self._logger = logging.getLogger(__name__)
+        self._cache = cache
+        self._batch_size = batch_size
+        self._block_ms = block_ms
+        self._reclaim_after_ms = reclaim_after_ms
+        self._max_deliveries = max_deliveries
+        self._max_len = max_len
+        self._group_ready = False
+
+    @property
+    def _client(self):
+        return self._cache.client_for(OUTBOX_STREAM)
+
+    @property
+    def _consumer(self):
+        return '{}-{}'.format(socket.gethostname(), os.getpid())
+
+    def enqueue(self, route, payload):
+        """
+        Spool a task and return its id, or None if it could not be spooled
+        """
+        task_id = str(uuid.uuid4())
+        try:
+            self._client.xadd(OUTBOX_STREAM, {'route': route, 'task_id': task_id, 'payload': json.dumps(payload)},
+                              maxlen=self._max_len, approximate=True)
+        except Exception as e:
+            self._logger.error('Error in spooling {} task {} : {}'.format(route, task_id, e))
+            return None
+        return task_id
+
+    def check_durable(self):
+        """
+        Raise RuntimeError unless the REDIS node holding the stream has appendonly enabled, as
+        spooled tasks would otherwise be lost with a cache restart
+        """
+        try:
+            appendonly = self._client.config_get('appendonly').get('appendonly')
+        except Exception as e:
+            raise RuntimeError('Unable to confirm the task outbox is persisted: {}'.format(e))
+        if _decode(appendonly) != 'yes':
+            raise RuntimeError('TASK_PUBLISH_MODE=outbox needs appendonly enabled on the REDIS node holding {}'.format(
+                OUTBOX_STREAM))
+
+    def _ensure_group(self):
+        try:
+            self._client.xgroup_create(OUTBOX_STREAM, OUTBOX_GROUP, id='0', mkstream=True)
+        except Exception as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+
+    def _dead_letter(self, entry_ids):
+        dead_letters = self._cache.client_for(OUTBOX_DEAD_LETTER_STREAM)
+        for entry_id in entry_ids:
+            for _, fields in self._client.xrange(OUTBOX_STREAM, entry_id, entry_id):
+                dead_letters.xadd(OUTBOX_DEAD_LETTER_STREAM, fields, maxlen=self._max_len, approximate=True)
+            self._logger.error('Gave up publishing outbox entry {} after {} attempts, moved it to {}'.format(
+                _decode(entry_id), self._max_deliveries, OUTBOX_DEAD_LETTER_STREAM))
+        self._client.xack(OUTBOX_STREAM, OUTBOX_GROUP, *entry_ids)
+        self._client.xdel(OUTBOX_STREAM, *entry_ids)
+
+    def _claim_stale(self):
+        pending = self._client.xpending_range(OUTBOX_STREAM, OUTBOX_GROUP, '-', '+', self._batch_size)
+        stale = [entry for entry in pending if entry['time_since_delivered'] >= self._reclaim_after_ms]
+        exhausted = [entry['message_id'] for entry in stale if entry['times_delivered'] >= self._max_deliveries]
+        if exhausted:
+            self._dead_letter(exhausted)
+        retry = [entry['message_id'] for entry in stale if entry['times_delivered'] < self._max_deliveries]
+        if not retry:
+            return []
+        return self._client.xclaim(OUTBOX_STREAM, OUTBOX_GROUP, self._consumer, self._reclaim_after_ms, retry)
+
+    def _read_new(self):
+        streams = self._client.xreadgroup(OUTBOX_GROUP, self._consumer, {OUTBOX_STREAM: '>'},
+                                          count=self._batch_size, block=self._block_ms)
+        return streams[0][1] if streams else []
+
+    def publish_batch(self, entries):
+        """
+        Send spooled entries to the broker and acknowledge the ones that were confirmed.
+        Returns the number of entries published. A broker connection failure ends the batch
+        and is raised once the published entries are acknowledged; the rest stay pending and
+        are reclaimed later, so an outage costs one entry's retries rather than a whole batch's.
+        """
+        from kombu.exceptions import OperationalError
+
+        celery = get_celery()
+        published = []
+        try:
+            for entry_id, fields in entries:
+                fields = {_decode(key): _decode(value) for key, value in fields.items()}
+                try:
+                    celery.send_task(fields['route'], args=(json.loads(fields['payload']),), task_id=fields['task_id'],
+                                     retry=True, retry_policy=PUBLISH_RETRY_POLICY)
+                    published.append(entry_id)
+                except (OperationalError, ConnectionError):
+                    raise
+                except Exception as e:
+                    self._logger.error('Error in publishing {} task {} : {}'.format(fields.get('route'), fields.get('task_id'), e))
+        finally:
+            if published:
+                self._client.xack(OUTBOX_STREAM, OUTBOX_GROUP, *published)
+                self._client.xdel(OUTBOX_STREAM, *published)
+        return len(published)
+
+    def drain(self):
+        """
+        Publish one batch of spooled entries, stale ones first, waiting up to block_ms for new
+        entries when there are none. Returns the number of entries published.
+        """
+        try:
+            if not self._group_ready:
+                self._ensure_group()
+                self._group_ready = True
+            entries = self._claim_stale() or self._read_new()
+        except Exception:
+            # e.g. the group went missing with the stream; create it again on the next call
+            self._group_ready = False
+            raise
+        return self.publish_batch(entries) if entries else 0
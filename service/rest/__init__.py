@@ -3,21 +3,60 @@ import os
 from csetutils.flask import instrument
 from flask import Flask
 
+from celeryconfig import (TASK_PUBLISH_OUTBOX, get_celery,
+                          reset_celery_after_fork)
 from service.cache.redis_cache import RedisCache
+from service.outbox import TaskOutbox
 
 from .api import api as ns1
+from .metrics import MetricsCollector
+from .verdicts import VerdictStore
 
 
-def create_app(config):
+def create_app(config, cache_client_factory=None):
     app = Flask(__name__)
     app.config.SWAGGER_UI_JSONEDITOR = True
     app.config.SWAGGER_UI_DOC_EXPANSION = 'list'
     app.config['token_authority'] = config.TOKEN_AUTHORITY
-    app.config['cache'] = RedisCache(config.CACHE_SERVICE)
+    app.config['payload_log_sample_rate'] = config.PAYLOAD_LOG_SAMPLE_RATE
+    app.config['payload_log_max_chars'] = config.PAYLOAD_LOG_MAX_CHARS
+    app.config['sitemap_pages_field'] = config.SITEMAP_PAGES_FIELD
+    app.config['cache'] = RedisCache(config.CACHE_SERVICE, replica_reads=config.CACHE_REPLICA_READS,
+                                     connect_timeout=config.CACHE_CONNECT_TIMEOUT,
+                                     socket_timeout=config.CACHE_SOCKET_TIMEOUT, client_factory=cache_client_factory)
+    app.config['outbox'] = TaskOutbox(app.config['cache']) if config.TASK_PUBLISH_MODE == TASK_PUBLISH_OUTBOX else None
+    app.config['verdicts'] = VerdictStore(app.config['cache'], config.VERDICT_REUSE, max_age=config.VERDICT_MAX_AGE)
+    app.config['metrics'] = MetricsCollector(app.config['cache'], verdicts=app.config['verdicts'],
+                                             refresh_interval=config.METRICS_REFRESH_INTERVAL)
     app.register_blueprint(ns1)
     instrument(app, 'auto-abuse-id', env=os.getenv('sysenv', 'dev'), sso=config.TOKEN_AUTHORITY, excluded_paths=[
         '/doc/',
-        '/classify/health'
+        '/classify/health',
+        '/classify/metrics'
     ], min_status_code=300)
 
     return app
+
+
+def warm_up(app):
+    """
+    Import and build everything the request handlers lazily depend on. Meant to run once in
+    the uWSGI master before it forks so spawned workers start hot. No sockets are opened here,
+    except that outbox mode refuses to start unless the cache holding the outbox persists it.
+    """
+    from . import schemas  # noqa: F401
+
+    if app.config.get('token_authority'):
+        import gd_auth.token  # noqa: F401
+    get_celery()
+    if app.config.get('outbox'):
+        app.config['outbox'].check_durable()
+
+
+def reset_after_fork(app):
+    """
+    Make a freshly forked worker reconnect to the broker and cache instead of reusing any
+    connection inherited from the master.
+    """
+    reset_celery_after_fork()
+    app.config['cache'].reset_after_fork()
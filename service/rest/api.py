@@ -3,19 +3,31 @@ import logging
 from functools import wraps
 
 from flask import Blueprint, current_app, request
-from gd_auth.token import AuthToken, TokenBusinessLevel
-from marshmallow import Schema, ValidationError, fields, validates_schema
 
-from celeryconfig import get_celery
+from celeryconfig import get_async_result, get_celery
+from service.log_utils import log_payload
+
+from .mask import WILDCARD, MaskError, apply_mask, parse_mask
+from .verdicts import KIND_CLASSIFY, KIND_SCAN
 
 _logger = logging.getLogger(__name__)
 
 FULL_DAY = 86400
 HALF_HOUR = 1800
+HEADER_FIELDS_MASK = 'X-Fields'
 KEY_CACHE = 'cache'
+KEY_CANDIDATE = 'candidate'
 KEY_CELERY = 'celery'
+KEY_CONFIDENCE = 'confidence'
+KEY_METADATA = 'metadata'
+KEY_METRICS = 'metrics'
+KEY_OUTBOX = 'outbox'
+KEY_REUSED = 'reused'
+KEY_SITEMAP = 'sitemap'
+KEY_SITEMAP_PAGES_FIELD = 'sitemap_pages_field'
 KEY_STATUS = 'status'
 KEY_URI = 'uri'
+KEY_VERDICTS = 'verdicts'
 PENDING = 'PENDING'
 
 # Phash celery endpoints
@@ -27,28 +39,6 @@ SCAN_REDIS_PREFIX = 'scan'
 api = Blueprint('classify', __name__, url_prefix='/classify')
 
 
-class MetadataSchema(Schema):
-    customerId = fields.String()
-    orionGuid = fields.String()
-    entitlementId = fields.String()
-    product = fields.String()
-
-    @validates_schema
-    def orion_or_entitlement_validation(self, data, **kwargs):
-        if 'orionGuid' not in data and data.get('orionGuid', '') == '' and 'entitlementId' not in data and data.get('entitlementId', '') == '':
-            raise ValidationError('one of orionGuid or entitlementId is required')
-
-
-class ScanInput(Schema):
-    uri = fields.URL()
-    sitemap = fields.Bool()
-    metadata = fields.Nested(MetadataSchema)
-
-
-class ClassifyInput(Schema):
-    uri = fields.URL()
-
-
 def token_required(f):
     @wraps(f)
     def wrapped(*args, **kwargs):
@@ -64,6 +54,8 @@ def token_required(f):
         if token.startswith('sso-jwt'):
             token = token[8:].strip()
 
+        from gd_auth.token import AuthToken, TokenBusinessLevel
+
         try:
             auth_token = AuthToken.parse(token, token_authority, 'auto-abuse-id', 'jomax')
 
@@ -77,6 +69,152 @@ def token_required(f):
     return wrapped
 
 
+def _log_payload(message, payload):
+    log_payload(_logger, message, payload,
+                sample_rate=current_app.config.get('payload_log_sample_rate', 1.0),
+                max_chars=current_app.config.get('payload_log_max_chars', 1024))
+
+
+def _send_task(route, payload):
+    """
+    Publish a task and return its id. With the outbox enabled the task is only spooled here
+    and published in the background; a direct send is the fallback if spooling fails.
+    """
+    outbox = current_app.config.get(KEY_OUTBOX)
+    task_id = outbox.enqueue(route, payload) if outbox else None
+    if not task_id:
+        task_id = get_celery().send_task(route, args=(payload,)).id
+    return task_id
+
+
+def _field_mask():
+    """
+    Parsed X-Fields header of the current request, None when every field is wanted
+    """
+    return parse_mask(request.headers.get(HEADER_FIELDS_MASK))
+
+
+def _index_sitemap_pages(jid, res):
+    """
+    Point the scan dedupe entry of every page found by a completed sitemap scan at the parent
+    job, so later single-URI submissions for those pages are answered from REDIS. Only jobs
+    submitted with sitemap=True are expanded, going by the dedupe entry of their root URI, and
+    pages with a dedupe entry of their own are left alone.
+    """
+    root_uri = res.get(KEY_URI)
+    if not root_uri:
+        return
+    cache = current_app.config.get(KEY_CACHE)
+    submitted = cache.get(f'{SCAN_REDIS_PREFIX}:{root_uri}')
+    submitted = json.loads(submitted) if submitted else {}
+    if submitted.get('id') != jid or not submitted.get(KEY_SITEMAP):
+        return
+
+    pages_field = current_app.config.get(KEY_SITEMAP_PAGES_FIELD)
+    if pages_field not in res:
+        _logger.warning('Sitemap scan %s of %s has no %s field; its pages were not indexed', jid, root_uri, pages_field)
+        return
+    entries = {}
+    for page in res.get(pages_field) or []:
+        uri = page.get(KEY_URI) if isinstance(page, dict) else page
+        if uri and uri != root_uri:
+            entries[f'{SCAN_REDIS_PREFIX}:{uri}'] = json.dumps(
+                dict(id=jid, status=res.get(KEY_STATUS), uri=uri, sitemap=False, parent=root_uri))
+    if entries:
+        cache.add_many(entries, ttl=FULL_DAY, overwrite=False)
+
+
+def _cached_intake(key, reusable=True):
+    """
+    The intake response cached under the URI key, or None. Answers reused from another
+    endpoint are marked, and only returned to requests that could have been answered that way.
+    """
+    cached_val = current_app.config.get(KEY_CACHE).get(key)
+    if not cached_val:
+        return None
+    cached = json.loads(cached_val)
+    if cached.pop(KEY_REUSED, False) and not reusable:
+        return None
+    return cached
+
+
+def _cache_intake(key, resp, ttl, reused=False):
+    """
+    Cache an intake response under the URI key. A reused answer is marked and kept no longer
+    than the verdict it came from is allowed to be reused.
+    """
+    if reused:
+        resp = dict(resp, **{KEY_REUSED: True})
+        ttl = min(ttl, current_app.config.get(KEY_VERDICTS).max_age)
+    current_app.config.get(KEY_CACHE).add(key, json.dumps(resp), ttl=ttl)
+
+
+def _reuse_verdict(kind, uri):
+    """
+    Answer a request of kind for uri from a recent result of the other endpoint, when the
+    VERDICT_REUSE rules allow it. The answer follows the response schema of kind and is also
+    cached as that endpoint's result for the reused jid, so polling it returns the same shape.
+    Returns None when a job has to be queued.
+    """
+    found = current_app.config.get(KEY_VERDICTS).find(kind, uri)
+    if not found:
+        return None
+    source, verdict = found
+    _logger.info('Answered %s request for %s from %s job %s', kind, uri, source, verdict['id'])
+    if kind == KIND_CLASSIFY:
+        prefix = CLASSIFY_REDIS_PREFIX
+        resp = dict(id=verdict['id'], status=verdict[KEY_STATUS], confidence=verdict['result'][KEY_CONFIDENCE],
+                    candidate=uri)
+    else:
+        prefix = SCAN_REDIS_PREFIX
+        resp = dict(id=verdict['id'], status=verdict[KEY_STATUS], uri=uri, sitemap=False)
+    current_app.config.get(KEY_CACHE).add_fields(f'{prefix}:{resp["id"]}',
+                                                 {field: json.dumps(value) for field, value in resp.items()}, ttl=FULL_DAY)
+    return resp
+
+
+def _scan_completed(jid, res):
+    _index_sitemap_pages(jid, res)
+    current_app.config.get(KEY_VERDICTS).record(KIND_SCAN, res.get(KEY_URI), jid, res)
+
+
+def _classification_completed(jid, res):
+    current_app.config.get(KEY_VERDICTS).record(KIND_CLASSIFY, res.get(KEY_CANDIDATE), jid, res)
+
+
+def _get_job_result(prefix, jid, mask, on_complete=None):
+    """
+    Completed results are cached in REDIS as one hash field per top-level result field, so a
+    masked poll (e.g. X-Fields: status) only reads the fields it asked for. on_complete is
+    called with the jid and result the first time a completed result is cached.
+    """
+    _unique_redis_key = f'{prefix}:{jid}'
+    cache = current_app.config.get(KEY_CACHE)
+    fields = None if mask is None or WILDCARD in mask else set(mask) | {KEY_STATUS}
+    cached_fields = cache.get_fields(_unique_redis_key, fields)
+    if cached_fields:
+        return {field: json.loads(value) for field, value in cached_fields.items()}
+
+    if cached_fields is None:
+        # A result cached as a single JSON string before field storage. Those expired FULL_DAY
+        # after the release, so remove this branch after 2026-11-02.
+        cached_val = cache.get(_unique_redis_key)
+        if cached_val:
+            return json.loads(cached_val)
+
+    asyn_res = get_async_result(jid)
+    status = asyn_res.state
+    if asyn_res.ready():
+        res = asyn_res.get()
+        res[KEY_STATUS] = status
+        cache.add_fields(_unique_redis_key, {field: json.dumps(value) for field, value in res.items()}, ttl=FULL_DAY)
+        if on_complete:
+            on_complete(jid, res)
+        return res
+
+    return dict(id=jid, status=status)
+
+
 @api.route('/health', methods=['GET'], endpoint='health')
 def healthcheck():
     """
@@ -85,6 +223,16 @@ def healthcheck():
     return 'OK', 200
 
 
+@api.route('/metrics', methods=['GET'], endpoint='metrics')
+def metrics():
+    """
+    Autoscaling signals: broker queue depths, requests in flight per uWSGI worker and the busy
+    ratio. Broker and REDIS figures are refreshed by the uWSGI mule
+    every METRICS_REFRESH_INTERVAL seconds.
+    """
+    return current_app.config.get(KEY_METRICS).snapshot(), 200
+
+
 @api.route('/scan', methods=['POST'], endpoint='scan')
 @token_required
 def create_scan_job():
@@ -92,25 +240,34 @@ def create_scan_job():
     Submit URI for scanning and potential Abuse API ticket creation.
     Writes entry to REDIS using URI as key, which lasts 30 minutes. If another request for
     the same URI is received within 30 minutes, the REDIS record is returned.
+    A recent classification of the URI is returned instead when VERDICT_REUSE allows it, unless
+    the request asks for a sitemap scan or carries metadata.
     """
+    from .schemas import ScanInput
+
     payload = request.json
-    _logger.info(f'Provided Payload for scan: {payload}')
+    _log_payload('Provided Payload for scan: %s', payload)
     try:
         schema = ScanInput()
         schema.load(payload)
         uri = payload.get(KEY_URI)
         _unique_redis_key = f'{SCAN_REDIS_PREFIX}:{uri}'
 
-        cache = current_app.config.get(KEY_CACHE)
-        cached_val = cache.get(_unique_redis_key)
-        if cached_val:
-            return json.loads(cached_val), 201
-
-        result = get_celery().send_task(SCAN_ROUTE, args=(payload,))
-        scan_resp = dict(id=result.id, status=PENDING, uri=uri, sitemap=payload.get('sitemap'))
-        cache.add(_unique_redis_key, json.dumps(scan_resp), ttl=FULL_DAY)
-        _logger.info(f'{scan_resp}')
-        return scan_resp, 201
+        mask = _field_mask()
+        # A sitemap scan expands the whole site, which no single-URI classification covers, and
+        # metadata drives ticket creation, which only a scan of this request can do
+        reusable = not payload.get(KEY_SITEMAP) and not payload.get(KEY_METADATA)
+        cached = _cached_intake(_unique_redis_key, reusable)
+        if cached:
+            return apply_mask(cached, mask), 201
+
+        scan_resp = _reuse_verdict(KIND_SCAN, uri) if reusable else None
+        reused = bool(scan_resp)
+        if not reused:
+            scan_resp = dict(id=_send_task(SCAN_ROUTE, payload), status=PENDING, uri=uri, sitemap=payload.get(KEY_SITEMAP))
+        _cache_intake(_unique_redis_key, scan_resp, FULL_DAY, reused)
+        _logger.info('%s', scan_resp)
+        return apply_mask(scan_resp, mask), 201
     except Exception as e:
         return {'message': str(e)}, 400
 
@@ -122,22 +279,13 @@ def get_scan_job(jid):
     Obtain the results or status of a previously submitted scan request.
     Writes entry to REDIS using JID as key, which lasts for 24 hours. Any requests received
     for the same JID within that 24 hour window will receive the record data from REDIS.
+    Pages found by a completed sitemap scan get a 24 hour URI entry pointing at this JID.
     """
-    _unique_redis_key = f'{SCAN_REDIS_PREFIX}:{jid}'
-    cache = current_app.config.get(KEY_CACHE)
-    cached_val = cache.get(_unique_redis_key)
-    if cached_val:
-        return json.loads(cached_val), 200
-
-    asyn_res = get_celery().AsyncResult(jid)
-    status = asyn_res.state
-    if asyn_res.ready():
-        res = asyn_res.get()
-        res[KEY_STATUS] = status
-        cache.add(_unique_redis_key, json.dumps(res), ttl=FULL_DAY)
-        return res, 200
-
-    return dict(id=jid, status=status), 200
+    try:
+        mask = _field_mask()
+    except MaskError as e:
+        return {'message': str(e)}, 400
+    return apply_mask(_get_job_result(SCAN_REDIS_PREFIX, jid, mask, on_complete=_scan_completed), mask), 200
 
 
 @api.route('/classification', methods=['POST'], endpoint='classification')
@@ -148,26 +296,31 @@ def create_classify_job():
     Endpoint to handle intake of URIs reported as possibly containing abuse.
     Writes entry to REDIS using URI as key, which lasts 30 minutes. If another request for
     the same URI is received within 30 minutes, the REDIS record is returned.
+    A recent scan of the URI is returned instead when VERDICT_REUSE allows it.
     """
+    from .schemas import ClassifyInput
+
     payload = request.json
     try:
         schema = ClassifyInput()
-        _logger.info(f'Provided Payload for classification: {payload}')
+        _log_payload('Provided Payload for classification: %s', payload)
         schema.load(payload)
         uri = payload.get(KEY_URI)
         _unique_redis_key = f'{CLASSIFY_REDIS_PREFIX}:{uri}'
 
-        cache = current_app.config.get(KEY_CACHE)
-        cached_val = cache.get(_unique_redis_key)
-        if cached_val:
-            return json.loads(cached_val), 201
+        mask = _field_mask()
+        cached = _cached_intake(_unique_redis_key)
+        if cached:
+            return apply_mask(cached, mask), 201
 
-        result = get_celery().send_task(CLASSIFY_ROUTE, args=(payload,))
-        classification_resp = dict(id=result.id, status=PENDING, candidate=uri)
-        cache.add(_unique_redis_key, json.dumps(classification_resp), ttl=HALF_HOUR)
-        _logger.info(f'{classification_resp}')
+        classification_resp = _reuse_verdict(KIND_CLASSIFY, uri)
+        reused = bool(classification_resp)
+        if not reused:
+            classification_resp = dict(id=_send_task(CLASSIFY_ROUTE, payload), status=PENDING, candidate=uri)
+        _cache_intake(_unique_redis_key, classification_resp, HALF_HOUR, reused)
+        _logger.info('%s', classification_resp)
 
-        return classification_resp, 201
+        return apply_mask(classification_resp, mask), 201
     except Exception as e:
         return {'message': str(e)}, 400
 
@@ -180,17 +333,8 @@ def get_classification_result(jid):
     Writes entry to REDIS using JID as key, which lasts for 24 hours. Any requests received
     for the same JID within that 24 hour window will receive the record data from REDIS.
     """
-    _unique_redis_key = f'{CLASSIFY_REDIS_PREFIX}:{jid}'
-    cache = current_app.config.get(KEY_CACHE)
-    cached_val = cache.get(_unique_redis_key)
-    if cached_val:
-        return json.loads(cached_val), 200
-
-    asyn_res = get_celery().AsyncResult(jid)
-    status = asyn_res.state
-    if asyn_res.ready():
-        res = asyn_res.get()
-        res[KEY_STATUS] = status
-        cache.add(_unique_redis_key, json.dumps(res), ttl=FULL_DAY)
-        return res, 200
-    return dict(id=jid, status=status), 200
+    try:
+        mask = _field_mask()
+    except MaskError as e:
+        return {'message': str(e)}, 400
+    return apply_mask(_get_job_result(CLASSIFY_REDIS_PREFIX, jid, mask, on_complete=_classification_completed), mask), 200
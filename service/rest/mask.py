@@ -0,0 +1,65 @@
+import re
+
+WILDCARD = '*'
+
+_TOKENS = re.compile(r'\s*([{},]|[^{},\s]+)')
+
+
+class MaskError(ValueError):
+    """
+    Raised when an X-Fields mask can't be parsed
+    """
+
+
+def parse_mask(mask):
+    """
+    Parse an X-Fields mask such as '{id,status}', 'id,status' or 'id,result{confidence}'
+    into a dict of field name to nested mask (None when the whole field is wanted).
+    Returns None for an empty mask, which means every field.
+    """
+    if not mask or not mask.strip():
+        return None
+    tokens = _TOKENS.findall(mask.strip())
+    if tokens[0] == '{':
+        if tokens[-1] != '}':
+            raise MaskError('Missing closing bracket in mask: {}'.format(mask))
+        tokens = tokens[1:-1]
+
+    root = {}
+    stack = [root]
+    previous = None
+    for token in tokens:
+        if token == '{':
+            if previous is None:
+                raise MaskError('Unexpected opening bracket in mask: {}'.format(mask))
+            stack[-1][previous] = {}
+            stack.append(stack[-1][previous])
+            previous = None
+        elif token == '}':
+            if len(stack) == 1:
+                raise MaskError('Unexpected closing bracket in mask: {}'.format(mask))
+            stack.pop()
+            previous = None
+        elif token == ',':
+            previous = None
+        else:
+            stack[-1][token] = None
+            previous = token
+    if len(stack) != 1:
+        raise MaskError('Missing closing bracket in mask: {}'.format(mask))
+    return root or None
+
+
+def apply_mask(data, mask):
+    """
+    Keep only the fields of data selected by a parsed mask. Lists are masked item by item.
+    """
+    if mask is None:
+        return data
+    if isinstance(data, list):
+        return [apply_mask(item, mask) for item in data]
+    if not isinstance(data, dict):
+        return data
+    if WILDCARD in mask:
+        return {key: apply_mask(value, mask.get(key)) for key, value in data.items()}
+    return {key: apply_mask(data[key], sub_mask) for key, sub_mask in mask.items() if key in data}
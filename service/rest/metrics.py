@@ -0,0 +1,79 @@
+import json
+import logging
+import time
+
+from celeryconfig import get_celery
+
+SNAPSHOT_REDIS_KEY = 'metrics:snapshot'
+
+
+class MetricsCollector(object):
+    """
+    Autoscaling signals: broker queue depths (ready messages per queue, so running jobs are not
+    included) and how many requests were answered from another endpoint's result instead of
+    queueing duplicate work. Pending jids are not tracked. These are gathered by refresh(),
+    which runs in the single uWSGI mule of each pod (see mule.py), and stored in REDIS, so a
+    scrape never waits on the broker. Worker figures come from the uWSGI master's shared stats
+    at scrape time.
+    """
+
+    def __init__(self, cache, verdicts=None, refresh_interval=15):
+        self._logger = logging.getLogger(__name__)
+        self._cache = cache
+        self._verdicts = verdicts
+        self._refresh_interval = refresh_interval
+        self._queues = None
+
+    @property
+    def refresh_interval(self):
+        return self._refresh_interval
+
+    def _queue_depths(self):
+        celery = get_celery()
+        depths = {}
+        with celery.connection_for_read() as conn:
+            conn.ensure_connection(max_retries=1)
+            channel = conn.default_channel
+            for queue in celery.conf.task_queues:
+                _, messages, consumers = channel.queue_declare(queue=queue.name, passive=True)
+                depths[queue.name] = dict(messages=messages, consumers=consumers)
+        return depths
+
+    def refresh(self):
+        """
+        Re-read queue depths and reuse counts and store them for every worker to serve. A
+        broker failure keeps the previous queue depths. Snapshots expire after a few missed
+        refreshes, so a dead mule shows up as empty figures rather than stale ones.
+        """
+        try:
+            self._queues = self._queue_depths()
+        except Exception as e:
+            self._logger.warning('Unable to read broker queue depths: {}'.format(e))
+        snapshot = dict(
+            queues=self._queues,
+            reused_verdicts=self._verdicts.reused_counts() if self._verdicts else {},
+            refreshed_at=time.time()
+        )
+        self._cache.add(SNAPSHOT_REDIS_KEY, json.dumps(snapshot), ttl=self._refresh_interval * 4)
+        return snapshot
+
+    @staticmethod
+    def _uwsgi_workers():
+        try:
+            import uwsgi
+        except ImportError:  # Not running under uWSGI
+            return None
+        # The worker answering this scrape is busy with it, which is not load worth scaling on.
+        scraper = uwsgi.worker_id()
+        workers = [dict(id=worker['id'], requests=worker['requests'],
+                        in_flight=int(worker['status'] == 'busy' and worker['id'] != scraper))
+                   for worker in uwsgi.workers() if worker['status'] != 'cheap']
+        busy = sum(worker['in_flight'] for worker in workers)
+        return dict(busy=busy, active=len(workers), total=len(uwsgi.workers()),
+                    busy_ratio=float(busy) / len(workers) if workers else 0.0, workers=workers)
+
+    def snapshot(self):
+        cached = self._cache.get(SNAPSHOT_REDIS_KEY)
+        snapshot = json.loads(cached) if cached else dict(queues=None, reused_verdicts=None, refreshed_at=None)
+        snapshot['uwsgi'] = self._uwsgi_workers()
+        return snapshot
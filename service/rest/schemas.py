@@ -0,0 +1,23 @@
+from marshmallow import Schema, ValidationError, fields, validates_schema
+
+
+class MetadataSchema(Schema):
+    customerId = fields.String()
+    orionGuid = fields.String()
+    entitlementId = fields.String()
+    product = fields.String()
+
+    @validates_schema
+    def orion_or_entitlement_validation(self, data, **kwargs):
+        if 'orionGuid' not in data and data.get('orionGuid', '') == '' and 'entitlementId' not in data and data.get('entitlementId', '') == '':
+            raise ValidationError('one of orionGuid or entitlementId is required')
+
+
+class ScanInput(Schema):
+    uri = fields.URL()
+    sitemap = fields.Bool()
+    metadata = fields.Nested(MetadataSchema)
+
+
+class ClassifyInput(Schema):
+    uri = fields.URL()
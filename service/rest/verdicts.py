@@ -0,0 +1,88 @@
+import json
+import time
+
+KIND_CLASSIFY = 'classify'
+KIND_SCAN = 'scan'
+SUCCESS = 'SUCCESS'
+
+VERDICT_REDIS_PREFIX = 'verdict'
+REUSED_REDIS_PREFIX = 'verdict:reused'
+
+# Result fields the intake responses are built from; the rest (e.g. sitemap pages) is not kept
+RESULT_FIELDS = ('confidence',)
+# Result fields a verdict must carry to answer a request of each kind
+REQUIRED_FIELDS = {KIND_CLASSIFY: ('confidence',), KIND_SCAN: ()}
+
+
+def parse_rules(rules):
+    """
+    Parse 'source:target' pairs such as 'scan:classify,classify:scan' into (source, target)
+    tuples. 'scan:classify' lets a completed scan answer a classification request.
+    """
+    pairs = []
+    for rule in (rules or '').split(','):
+        source, _, target = rule.strip().partition(':')
+        if source in (KIND_SCAN, KIND_CLASSIFY) and target in (KIND_SCAN, KIND_CLASSIFY) and source != target:
+            pairs.append((source, target))
+    return pairs
+
+
+class VerdictStore(object):
+    """
+    Shared per-URI record of the latest completed scan and classification. Both intake
+    endpoints consult it, so, where a rule allows, a recent result from one endpoint answers
+    a request to the other instead of queueing the same URI again.
+    """
+
+    def __init__(self, cache, rules, max_age=1800):
+        self._cache = cache
+        self._rules = parse_rules(rules)
+        self._max_age = max_age
+
+    @property
+    def rules(self):
+        return list(self._rules)
+
+    @property
+    def max_age(self):
+        return self._max_age
+
+    def record(self, kind, uri, jid, result):
+        """
+        Remember a completed result of kind for uri
+        """
+        if not uri or not any(kind == source for source, _ in self._rules):
+            return
+        verdict = dict(id=jid, status=result.get('status'), completed_at=time.time(),
+                       result={field: result[field] for field in RESULT_FIELDS if field in result})
+        self._cache.add_fields(f'{VERDICT_REDIS_PREFIX}:{uri}', {kind: json.dumps(verdict)},
+                               ttl=self._max_age, replace=False)
+
+    def find(self, kind, uri):
+        """
+        Return (source kind, verdict) for the freshest successful verdict that satisfies a
+        request of kind for uri under the configured rules and carries the result fields that
+        request needs, or None
+        """
+        sources = [source for source, target in self._rules if target == kind]
+        if not sources:
+            return None
+        found = None
+        oldest = time.time() - self._max_age
+        for source, value in self._cache.get_fields(f'{VERDICT_REDIS_PREFIX}:{uri}', sources).items():
+            verdict = json.loads(value)
+            complete = all(field in verdict.get('result', {}) for field in REQUIRED_FIELDS[kind])
+            if verdict.get('status') == SUCCESS and verdict.get('completed_at', 0) >= oldest and complete:
+                if not found or verdict['completed_at'] > found[1]['completed_at']:
+                    found = (source, verdict)
+        if found:
+            self._cache.increment(f'{REUSED_REDIS_PREFIX}:{found[0]}:{kind}')
+        return found
+
+    def reused_counts(self):
+        """
+        Requests answered from another endpoint's result, per 'source:target' rule
+        """
+        names = [f'{source}:{target}' for source, target in self._rules]
+        counts = self._cache.get_many([f'{REUSED_REDIS_PREFIX}:{name}' for name in names])
+        return {name: int(count or 0) for name, count in zip(names, counts)}
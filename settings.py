@@ -8,9 +8,43 @@ class AppConfig(object):
     DB_PORT = 27017
     DB_USER = 'dbuser'
     DB_HOST = 'localhost'
+    CACHE_REPLICA_READS = False
+    CACHE_CONNECT_TIMEOUT = 0.5
+    CACHE_SOCKET_TIMEOUT = 2.0
+    RESULT_BACKEND = 'mongodb'
+    RESULT_REDIS_URL = 'redis://localhost:6379/1'
+    RESULT_EXPIRES = 86400  # Matches how long completed results are cached
+    PAYLOAD_LOG_SAMPLE_RATE = 1.0
+    PAYLOAD_LOG_MAX_CHARS = 1024
+    METRICS_REFRESH_INTERVAL = 15
+    TASK_PUBLISH_MODE = 'direct'
+    VERDICT_REUSE = ''
+    VERDICT_MAX_AGE = 1800
+    SITEMAP_PAGES_FIELD = 'pages'
 
     def __init__(self):
+        # Comma separated cache nodes, each optionally followed by |-separated read replicas
         self.CACHE_SERVICE = os.getenv('REDIS', 'localhost')
+        self.CACHE_REPLICA_READS = os.getenv('REDIS_REPLICA_READS', 'False').lower() == 'true'
+        # Seconds to connect to / wait on a cache node; the read timeout must outlast the outbox's 1s XREADGROUP block
+        self.CACHE_CONNECT_TIMEOUT = float(os.getenv('REDIS_CONNECT_TIMEOUT', self.CACHE_CONNECT_TIMEOUT))
+        self.CACHE_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', self.CACHE_SOCKET_TIMEOUT))
+        # mongodb, redis, or dual (redis, falling back to mongodb reads while migrating)
+        self.RESULT_BACKEND = os.getenv('RESULT_BACKEND', self.RESULT_BACKEND)
+        self.RESULT_REDIS_URL = os.getenv('RESULT_REDIS_URL', self.RESULT_REDIS_URL)
+        # Share of intake requests whose payload is logged, and how much of it
+        self.PAYLOAD_LOG_SAMPLE_RATE = float(os.getenv('PAYLOAD_LOG_SAMPLE_RATE', self.PAYLOAD_LOG_SAMPLE_RATE))
+        self.PAYLOAD_LOG_MAX_CHARS = int(os.getenv('PAYLOAD_LOG_MAX_CHARS', self.PAYLOAD_LOG_MAX_CHARS))
+        # Seconds between background refreshes of broker queue depths for /classify/metrics. Only ready
+        # messages are counted; running jobs and pending (submitted, unfinished) jids are not reported.
+        self.METRICS_REFRESH_INTERVAL = int(os.getenv('METRICS_REFRESH_INTERVAL', self.METRICS_REFRESH_INTERVAL))
+        # direct, or outbox to spool tasks in REDIS (which must have appendonly on) and publish them from the mule
+        self.TASK_PUBLISH_MODE = os.getenv('TASK_PUBLISH_MODE', self.TASK_PUBLISH_MODE)
+        # source:target pairs, e.g. scan:classify lets a completed scan answer classification requests
+        self.VERDICT_REUSE = os.getenv('VERDICT_REUSE', self.VERDICT_REUSE)
+        self.VERDICT_MAX_AGE = int(os.getenv('VERDICT_MAX_AGE', self.VERDICT_MAX_AGE))
+        # Field of a completed sitemap scan result that lists the pages it found
+        self.SITEMAP_PAGES_FIELD = os.getenv('SITEMAP_PAGES_FIELD', self.SITEMAP_PAGES_FIELD)
 
 
 class ProductionAppConfig(AppConfig):
@@ -7,20 +7,26 @@ from flask_testing.utils import TestCase
 from mock import MagicMock, patch
 
 import service.rest
+from service.rest.verdicts import VerdictStore
 from settings import config_by_name
-from tests.mock_redis import MockRedis
+from tests.mock_redis import MockRedisNodes
 
 
 class TestRest(TestCase):
 
     def create_app(self):
-        app = service.rest.create_app(config_by_name['test']())
-        app.config.get('cache')._redis = MockRedis()
-        return app
+        return service.rest.create_app(config_by_name['test'](), cache_client_factory=MockRedisNodes())
 
     def setUp(self):
         self.client = self.app.test_client()
 
+    def test_metrics(self):
+        response = self.client.get(url_for('classify.metrics'))
+        self.assertEqual(response.status_code, 200)
+        resp_data = json.loads(response.data)
+        self.assertIn('queues', resp_data)
+        self.assertIn('reused_verdicts', resp_data)
+
     ''' Scan Tests '''
 
     def test_scan_invalid_uri(self):
@@ -74,6 +80,80 @@ class TestRest(TestCase):
         resp_data = json.loads(response.data)
         self.assertEqual(resp_data.get('status'), 'SUCCESS')
 
+    @patch.object(Celery, 'AsyncResult')
+    def test_get_scan_status_field_mask(self, mock_result):
+        mock_result.return_value = MagicMock(
+            state='SUCCESS',
+            ready=lambda: True,
+            get=lambda: dict(id='456', uri='https://localhost.com', pages=['https://localhost.com/a']))
+        response = self.client.get(url_for('classify.scan') + '/456', headers={'X-Fields': 'status'})
+        self.assertEqual(json.loads(response.data), {'status': 'SUCCESS'})
+        mock_result.reset_mock()
+        response = self.client.get(url_for('classify.scan') + '/456', headers={'X-Fields': '{id,status}'})
+        self.assertEqual(json.loads(response.data), {'id': '456', 'status': 'SUCCESS'})
+        mock_result.assert_not_called()
+
+    def _post_scan(self, **data):
+        return self.client.post(
+            url_for('classify.scan'),
+            data=json.dumps(data),
+            headers={
+                'Content-Type': 'application/json'
+            })
+
+    @patch.object(Celery, 'send_task')
+    @patch.object(Celery, 'AsyncResult')
+    def test_get_scan_sitemap_indexes_pages(self, mock_result, send_task_method):
+        send_task_method.return_value = namedtuple('Resp', 'id')('789')
+        self._post_scan(uri='https://sitemap.com', sitemap=True)
+        send_task_method.return_value = namedtuple('Resp', 'id')('page_id')
+        self._post_scan(uri='https://sitemap.com/own')
+        mock_result.return_value = MagicMock(
+            state='SUCCESS',
+            ready=lambda: True,
+            get=lambda: dict(id='789', uri='https://sitemap.com',
+                             pages=['https://sitemap.com/a', {'uri': 'https://sitemap.com/b'}, 'https://sitemap.com/own']))
+        self.client.get(url_for('classify.scan') + '/789')
+        send_task_method.return_value = namedtuple('Resp', 'id')('some_other_id')
+        for uri, jid in (('https://sitemap.com/a', '789'), ('https://sitemap.com/b', '789'), ('https://sitemap.com/own', 'page_id')):
+            response = self._post_scan(uri=uri)
+            self.assertEqual(json.loads(response.data).get('id'), jid)
+        self.assertEqual(send_task_method.call_count, 2)
+
+    @patch.object(Celery, 'send_task')
+    @patch.object(Celery, 'AsyncResult')
+    def test_get_scan_without_sitemap_skips_pages(self, mock_result, send_task_method):
+        send_task_method.return_value = namedtuple('Resp', 'id')('789')
+        self._post_scan(uri='https://single.com')
+        mock_result.return_value = MagicMock(
+            state='SUCCESS',
+            ready=lambda: True,
+            get=lambda: dict(id='789', uri='https://single.com', pages=['https://single.com/a']))
+        self.client.get(url_for('classify.scan') + '/789')
+        send_task_method.return_value = namedtuple('Resp', 'id')('page_id')
+        response = self._post_scan(uri='https://single.com/a')
+        self.assertEqual(json.loads(response.data).get('id'), 'page_id')
+
+    @patch.object(Celery, 'send_task')
+    def test_scan_uri_outbox(self, send_task_method):
+        outbox = MagicMock()
+        outbox.enqueue.return_value = 'spooled_id'
+        self.client.application.config['outbox'] = outbox
+        data = dict(uri='https://outbox.com')
+        response = self.client.post(
+            url_for('classify.scan'),
+            data=json.dumps(data),
+            headers={
+                'Content-Type': 'application/json'
+            })
+        self.assertEqual(json.loads(response.data).get('id'), 'spooled_id')
+        outbox.enqueue.assert_called_once_with('scan.request', data)
+        send_task_method.assert_not_called()
+
+    def test_get_scan_invalid_field_mask(self):
+        response = self.client.get(url_for('classify.scan') + '/456', headers={'X-Fields': '{status'})
+        self.assertEqual(response.status_code, 400)
+
     @patch.object(Celery, 'AsyncResult')
     def test_get_scan_complete_cached_missing_auth_key(self, mock_result):
         mock_result.return_value = MagicMock(
@@ -150,6 +230,15 @@ class TestRest(TestCase):
         resp_data = json.loads(response.data)
         self.assertEqual(resp_data.get('status'), 'SUCCESS')
 
+    @patch.object(Celery, 'AsyncResult')
+    def test_get_classify_legacy_cached(self, mock_result):
+        self.app.config.get('cache').add('clas:legacy_id', json.dumps(dict(id='legacy_id', status='SUCCESS')))
+        response = self.client.get(
+            url_for('classify.classification') + '/legacy_id')
+        resp_data = json.loads(response.data)
+        self.assertEqual(resp_data.get('status'), 'SUCCESS')
+        mock_result.assert_not_called()
+
     @patch.object(Celery, 'send_task')
     def test_classify_uri_invalid_auth_key(self, send_task_method):
         send_task_method.return_value = namedtuple('Resp', 'id')('abc123')
@@ -177,6 +266,78 @@ class TestRest(TestCase):
             })
         self.assertEqual(response.status_code, 401)
 
+    @patch.object(Celery, 'send_task')
+    @patch.object(Celery, 'AsyncResult')
+    def test_classify_reuses_completed_scan(self, mock_result, send_task_method):
+        self.client.application.config['verdicts'] = VerdictStore(self.client.application.config['cache'], 'scan:classify')
+        mock_result.return_value = MagicMock(
+            state='SUCCESS',
+            ready=lambda: True,
+            get=lambda: dict(id='scan_verdict_id', uri='https://verdict.com', confidence=0.9))
+        self.client.get(url_for('classify.scan') + '/scan_verdict_id')
+        response = self.client.post(
+            url_for('classify.classification'),
+            data=json.dumps(dict(uri='https://verdict.com')),
+            headers={
+                'Content-Type': 'application/json'
+            })
+        resp_data = json.loads(response.data)
+        self.assertEqual(response.status_code, 201)
+        expected = dict(id='scan_verdict_id', status='SUCCESS', confidence=0.9, candidate='https://verdict.com')
+        self.assertEqual(resp_data, expected)
+        send_task_method.assert_not_called()
+        mock_result.reset_mock()
+        response = self.client.get(url_for('classify.classification') + '/scan_verdict_id')
+        self.assertEqual(json.loads(response.data), expected)
+        mock_result.assert_not_called()
+
+    @patch.object(Celery, 'send_task')
+    @patch.object(Celery, 'AsyncResult')
+    def test_scan_with_metadata_is_not_reused(self, mock_result, send_task_method):
+        self.client.application.config['verdicts'] = VerdictStore(self.client.application.config['cache'], 'classify:scan')
+        mock_result.return_value = MagicMock(
+            state='SUCCESS',
+            ready=lambda: True,
+            get=lambda: dict(id='clas_verdict_id', candidate='https://metadata.com', confidence=0.9))
+        self.client.get(url_for('classify.classification') + '/clas_verdict_id')
+        send_task_method.return_value = namedtuple('Resp', 'id')('scan_id')
+        response = self._post_scan(uri='https://metadata.com', metadata={'customerId': '123', 'orionGuid': 'abc'})
+        self.assertEqual(json.loads(response.data).get('id'), 'scan_id')
+
+    @patch.object(Celery, 'send_task')
+    @patch.object(Celery, 'AsyncResult')
+    def test_reused_scan_answer_does_not_serve_metadata_scan(self, mock_result, send_task_method):
+        self.client.application.config['verdicts'] = VerdictStore(self.client.application.config['cache'], 'classify:scan')
+        mock_result.return_value = MagicMock(
+            state='SUCCESS',
+            ready=lambda: True,
+            get=lambda: dict(id='c1', candidate='https://reused.com', confidence=0.9))
+        self.client.get(url_for('classify.classification') + '/c1')
+        self.assertEqual(json.loads(self._post_scan(uri='https://reused.com').data).get('id'), 'c1')
+        send_task_method.assert_not_called()
+        send_task_method.return_value = namedtuple('Resp', 'id')('scan_id')
+        response = self._post_scan(uri='https://reused.com', metadata={'customerId': '123', 'orionGuid': 'abc'})
+        self.assertEqual(json.loads(response.data), dict(id='scan_id', status='PENDING', uri='https://reused.com', sitemap=None))
+        send_task_method.assert_called_once()
+
+    @patch.object(Celery, 'send_task')
+    @patch.object(Celery, 'AsyncResult')
+    def test_scan_without_confidence_does_not_answer_classification(self, mock_result, send_task_method):
+        self.client.application.config['verdicts'] = VerdictStore(self.client.application.config['cache'], 'scan:classify')
+        mock_result.return_value = MagicMock(
+            state='SUCCESS',
+            ready=lambda: True,
+            get=lambda: dict(id='s1', uri='https://noconfidence.com'))
+        self.client.get(url_for('classify.scan') + '/s1')
+        send_task_method.return_value = namedtuple('Resp', 'id')('clas_id')
+        response = self.client.post(
+            url_for('classify.classification'),
+            data=json.dumps(dict(uri='https://noconfidence.com')),
+            headers={
+                'Content-Type': 'application/json'
+            })
+        self.assertEqual(json.loads(response.data), dict(id='clas_id', status='PENDING', candidate='https://noconfidence.com'))
+
     @patch.object(Celery, 'AsyncResult')
     def test_get_classify_complete_cached_invalid_auth_key(self, mock_result):
         mock_result.return_value = MagicMock(
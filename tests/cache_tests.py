@@ -0,0 +1,109 @@
+from unittest import TestCase
+
+from mock import patch
+
+from service.cache.hash_ring import HashRing
+from service.cache.redis_cache import RedisCache
+from tests.mock_redis import MockRedisNode, MockRedisNodes
+
+
+class TestHashRing(TestCase):
+
+    def setUp(self):
+        self._ring = HashRing(['cache-0', 'cache-1', 'cache-2'])
+
+    def test_keys_spread_over_nodes(self):
+        nodes = {self._ring.get_node('scan:https://{}.com'.format(i)) for i in range(100)}
+        self.assertEqual(nodes, {'cache-0', 'cache-1', 'cache-2'})
+
+    def test_hash_tag_colocates_keys(self):
+        self.assertEqual(self._ring.get_node('{site}:a'), self._ring.get_node('{site}:b'))
+        self.assertEqual(HashRing.hash_tag('{}:a'), '{}:a')
+
+    def test_removing_node_only_moves_its_keys(self):
+        keys = ['clas:{}'.format(i) for i in range(200)]
+        smaller = HashRing(['cache-0', 'cache-1'])
+        for key in keys:
+            if self._ring.get_node(key) != 'cache-2':
+                self.assertEqual(self._ring.get_node(key), smaller.get_node(key))
+
+
+class TestRedisCache(TestCase):
+
+    def test_client_is_lazy(self):
+        cache = RedisCache('localhost')
+        self.assertEqual(cache._clients, {})
+
+    def test_reset_after_fork_before_use(self):
+        cache = RedisCache('localhost')
+        cache.reset_after_fork()
+        self.assertEqual(cache._clients, {})
+
+    def test_injected_client_is_used(self):
+        cache = RedisCache('localhost', client_factory=lambda host: MockRedisNode())
+        cache.add('lazy:key', 'value')
+        self.assertEqual(cache.get('lazy:key'), 'value')
+
+    def test_connections_use_timeouts(self):
+        cache = RedisCache('cache-0:6380', connect_timeout=0.5, socket_timeout=2)
+        with patch('redis.Redis') as redis_class:
+            cache.get('scan:key')
+        redis_class.assert_called_once_with('cache-0', 6380, socket_connect_timeout=0.5, socket_timeout=2)
+
+    def test_parses_nodes_and_replicas(self):
+        cache = RedisCache('cache-0|cache-0-ro, cache-1:6380')
+        self.assertEqual(cache.hosts, ['cache-0', 'cache-0-ro', 'cache-1:6380'])
+
+    def test_keys_routed_to_owning_node(self):
+        nodes = MockRedisNodes()
+        cache = RedisCache('cache-0,cache-1,cache-2', client_factory=nodes)
+        keys = ['scan:https://{}.com'.format(i) for i in range(30)]
+        for key in keys:
+            cache.add(key, key)
+        for key in keys:
+            owner = cache._ring.get_node(key)
+            self.assertEqual(nodes[owner].get(key), key)
+            self.assertEqual(cache.get(key), key)
+        self.assertEqual(sorted(nodes), ['cache-0', 'cache-1', 'cache-2'])
+        self.assertTrue(all(node.redis for node in nodes.values()))
+
+    def test_batched_calls_span_nodes(self):
+        cache = RedisCache('cache-0,cache-1,cache-2', client_factory=MockRedisNodes())
+        mapping = {'scan:https://{}.com'.format(i): str(i) for i in range(30)}
+        cache.add_many(mapping, ttl=60)
+        keys = list(mapping) + ['scan:missing']
+        self.assertEqual(cache.get_many(keys), list(mapping.values()) + [None])
+
+    def test_batched_add_without_overwrite(self):
+        cache = RedisCache('cache-0,cache-1', client_factory=MockRedisNodes())
+        cache.add('scan:https://a.com', 'own')
+        cache.add_many({'scan:https://a.com': 'parent', 'scan:https://b.com': 'parent'}, overwrite=False)
+        self.assertEqual(cache.get_many(['scan:https://a.com', 'scan:https://b.com']), ['own', 'parent'])
+
+    def test_replica_reads(self):
+        nodes = MockRedisNodes({'cache-0-ro': 'cache-0'})
+        cache = RedisCache('cache-0|cache-0-ro', replica_reads=True, client_factory=nodes)
+        cache.add('scan:key', 'value')
+        with patch.object(nodes['cache-0'], 'get') as primary_get:
+            self.assertEqual(cache.get('scan:key'), 'value')
+            primary_get.assert_not_called()
+
+    def test_replica_failure_falls_back_to_primary(self):
+        nodes = MockRedisNodes({'cache-0-ro': 'cache-0'})
+        cache = RedisCache('cache-0|cache-0-ro', replica_reads=True, client_factory=nodes)
+        cache.add('scan:key', 'value')
+        with patch.object(nodes('cache-0-ro'), 'get', side_effect=ConnectionError):
+            self.assertEqual(cache.get('scan:key'), 'value')
+
+    def test_fields_round_trip(self):
+        cache = RedisCache('cache-0,cache-1', client_factory=MockRedisNodes())
+        cache.add_fields('scan:123', {'status': 'SUCCESS', 'uri': 'https://localhost.com'})
+        self.assertEqual(cache.get_fields('scan:123', ['status', 'missing']), {'status': 'SUCCESS'})
+        self.assertEqual(cache.get_fields('scan:123'), {'status': 'SUCCESS', 'uri': 'https://localhost.com'})
+        self.assertEqual(cache.get_fields('scan:unknown', ['status']), {})
+
+    def test_fields_of_string_value(self):
+        cache = RedisCache('cache-0', client_factory=MockRedisNodes())
+        cache.add('scan:123', '{"status": "SUCCESS"}')
+        self.assertIsNone(cache.get_fields('scan:123', ['status']))
+        self.assertIsNone(cache.get_fields('scan:123'))
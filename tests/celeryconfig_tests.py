@@ -0,0 +1,46 @@
+from unittest import TestCase
+
+from celery import Celery
+from mock import MagicMock, patch
+
+import celeryconfig
+from celeryconfig import CeleryConfig, get_async_result
+from settings import config_by_name
+
+
+class TestCeleryConfig(TestCase):
+
+    def setUp(self):
+        self._settings = config_by_name['test']()
+
+    def test_mongodb_result_backend_by_default(self):
+        config = CeleryConfig(self._settings)
+        self.assertEqual(config.result_backend, self._settings.DBURL)
+        self.assertEqual(config.result_expires, 86400)
+
+    def test_redis_result_backend(self):
+        self._settings.RESULT_BACKEND = 'redis'
+        config = CeleryConfig(self._settings)
+        self.assertEqual(config.result_backend, self._settings.RESULT_REDIS_URL)
+
+    def test_dual_mode_falls_back_to_mongodb(self):
+        self._settings.RESULT_BACKEND = 'dual'
+        app = Celery()
+        app.config_from_object(CeleryConfig(self._settings))
+        redis_result = MagicMock(state='PENDING')
+        mongo_result = MagicMock(state='SUCCESS')
+        with patch.object(celeryconfig, 'get_celery', return_value=app), \
+                patch.object(Celery, 'AsyncResult', side_effect=[redis_result, mongo_result]) as async_result:
+            self.assertIs(get_async_result('some_id'), mongo_result)
+        self.assertIsNotNone(async_result.call_args[1]['backend'])
+        celeryconfig.reset_celery_after_fork()
+
+    def test_redis_mode_does_not_fall_back(self):
+        self._settings.RESULT_BACKEND = 'redis'
+        app = Celery()
+        app.config_from_object(CeleryConfig(self._settings))
+        redis_result = MagicMock(state='PENDING')
+        with patch.object(celeryconfig, 'get_celery', return_value=app), \
+                patch.object(Celery, 'AsyncResult', return_value=redis_result) as async_result:
+            self.assertIs(get_async_result('some_id'), redis_result)
+        self.assertEqual(async_result.call_count, 1)
@@ -0,0 +1,49 @@
+import logging
+from io import StringIO
+from unittest import TestCase
+
+from mock import patch
+
+from service.log_utils import (DeferredQueueHandler, TruncatedPayload,
+                               log_payload, start_async_logging,
+                               stop_async_logging)
+
+
+class TestLogUtils(TestCase):
+
+    def setUp(self):
+        self._stream = StringIO()
+        self._root = logging.getLogger('tests.log_utils')
+        self._root.propagate = False
+        self._root.setLevel(logging.INFO)
+        self._root.addHandler(logging.StreamHandler(self._stream))
+        self._logger = self._root.getChild('api')
+
+    def tearDown(self):
+        stop_async_logging(self._root)
+        self._root.handlers = []
+
+    def test_truncated_payload(self):
+        self.assertEqual(str(TruncatedPayload({'uri': 'https://localhost.com'}, 0)), '{"uri": "https://localhost.com"}')
+        self.assertEqual(str(TruncatedPayload({'uri': 'https://localhost.com'}, 8)), '{"uri": ... (24 chars truncated)')
+
+    def test_payload_is_not_rendered_when_disabled(self):
+        self._root.setLevel(logging.WARNING)
+        with patch.object(TruncatedPayload, '__str__') as render:
+            log_payload(self._logger, 'Payload: %s', {'uri': 'https://localhost.com'})
+        render.assert_not_called()
+        self.assertEqual(self._stream.getvalue(), '')
+
+    def test_payload_sampling(self):
+        with patch('service.log_utils.random.random', side_effect=[0.05, 0.5]):
+            log_payload(self._logger, 'Payload: %s', {'id': 1}, sample_rate=0.1)
+            log_payload(self._logger, 'Payload: %s', {'id': 2}, sample_rate=0.1)
+        self.assertEqual(self._stream.getvalue(), 'Payload: {"id": 1}\n')
+
+    def test_async_logging(self):
+        start_async_logging(self._root)
+        self.assertIsInstance(self._root.handlers[0], DeferredQueueHandler)
+        log_payload(self._logger, 'Payload: %s', {'id': 1})
+        stop_async_logging(self._root)
+        self.assertEqual(self._stream.getvalue(), 'Payload: {"id": 1}\n')
+        self.assertIsInstance(self._root.handlers[0], logging.StreamHandler)
@@ -0,0 +1,30 @@
+from unittest import TestCase
+
+from service.rest.mask import MaskError, apply_mask, parse_mask
+
+
+class TestMask(TestCase):
+
+    def test_empty_mask(self):
+        self.assertIsNone(parse_mask(None))
+        self.assertIsNone(parse_mask(' '))
+        self.assertIsNone(parse_mask('{}'))
+
+    def test_parse_flat_and_nested(self):
+        self.assertEqual(parse_mask('{id, status}'), {'id': None, 'status': None})
+        self.assertEqual(parse_mask('status,result{confidence,pages{uri}}'),
+                         {'status': None, 'result': {'confidence': None, 'pages': {'uri': None}}})
+
+    def test_parse_errors(self):
+        for mask in ('{status', 'status}', '{status}}', 'result{uri', 'uri}}', '{{status}}'):
+            with self.assertRaises(MaskError):
+                parse_mask(mask)
+
+    def test_apply_mask(self):
+        data = {'id': '123', 'status': 'SUCCESS', 'result': {'confidence': 0.9, 'pages': [{'uri': 'a', 'x': 1}]}}
+        self.assertEqual(apply_mask(data, parse_mask('status')), {'status': 'SUCCESS'})
+        self.assertEqual(apply_mask(data, parse_mask('result{pages{uri}},missing')),
+                         {'result': {'pages': [{'uri': 'a'}]}})
+        self.assertEqual(apply_mask(data, parse_mask('*,result{confidence}')),
+                         {'id': '123', 'status': 'SUCCESS', 'result': {'confidence': 0.9}})
+        self.assertIs(apply_mask(data, None), data)
@@ -0,0 +1,48 @@
+import sys
+from unittest import TestCase
+
+from mock import MagicMock, patch
+
+from service.cache.redis_cache import RedisCache
+from service.rest.metrics import MetricsCollector
+from tests.mock_redis import MockRedisNodes
+
+
+class TestMetricsCollector(TestCase):
+
+    def setUp(self):
+        cache = RedisCache('localhost', client_factory=MockRedisNodes())
+        self._metrics = MetricsCollector(cache)
+
+    def test_snapshot_before_refresh(self):
+        snapshot = self._metrics.snapshot()
+        self.assertIsNone(snapshot['queues'])
+        self.assertIsNone(snapshot['refreshed_at'])
+
+    def test_refresh_is_shared_through_cache(self):
+        depths = {'devscan_tasks': dict(messages=3, consumers=1), 'devclassify_tasks': dict(messages=2, consumers=1)}
+        with patch.object(MetricsCollector, '_queue_depths', return_value=depths):
+            self._metrics.refresh()
+        worker = MetricsCollector(self._metrics._cache)
+        snapshot = worker.snapshot()
+        self.assertEqual(snapshot['queues'], depths)
+
+    def test_queue_depths_survive_broker_errors(self):
+        depths = {'devscan_tasks': dict(messages=3, consumers=1)}
+        with patch.object(MetricsCollector, '_queue_depths', return_value=depths):
+            self._metrics.refresh()
+        with patch.object(MetricsCollector, '_queue_depths', side_effect=ConnectionError):
+            self._metrics.refresh()
+        self.assertEqual(self._metrics.snapshot()['queues'], depths)
+
+    def test_uwsgi_busy_ratio_excludes_scraping_worker(self):
+        self.assertIsNone(self._metrics.snapshot()['uwsgi'])
+        workers = [dict(id=1, status='busy', requests=7), dict(id=2, status='idle', requests=3),
+                   dict(id=3, status='cheap', requests=0), dict(id=4, status='busy', requests=5)]
+        uwsgi = MagicMock(workers=lambda: workers, worker_id=lambda: 4)
+        with patch.dict(sys.modules, uwsgi=uwsgi):
+            stats = self._metrics.snapshot()['uwsgi']
+        self.assertEqual(stats['busy'], 1)
+        self.assertEqual((stats['active'], stats['total']), (3, 4))
+        self.assertEqual(stats['busy_ratio'], 1.0 / 3)
+        self.assertEqual([(worker['id'], worker['in_flight']) for worker in stats['workers']], [(1, 1), (2, 0), (4, 0)])
@@ -1,6 +1,10 @@
 import random
 from collections import defaultdict
 
+from redis.exceptions import ResponseError
+
+WRONGTYPE = 'WRONGTYPE Operation against a key holding the wrong kind of value'
+
 
 class MockRedisLock(object):
     """Poorly imitate a Redis lock object so unit tests can run on our Hudson
@@ -58,12 +62,26 @@ class MockRedis(object):
         result = '' if key not in self.redis else self.redis[key]
         return result
 
-    def set(self, key, data):
+    def set(self, key, data, ex=None, nx=False):
+        if nx and key in self.redis:
+            return None
         self.redis[key] = data
+        return True
+
+    def mget(self, keys):
+        """Emulate mget."""
+
+        return [self.redis[key] if key in self.redis else None for key in keys]
 
     def expire(self, key, ttl=0):
         pass
 
+    def incr(self, key, amount=1):
+        """Emulate incr."""
+
+        self.redis[key] = int(self.redis[key] if key in self.redis else 0) + amount
+        return self.redis[key]
+
     def keys(self, pattern):  # pylint: disable=R0201
         """Emulate keys."""
         import re
@@ -81,7 +99,7 @@ class MockRedis(object):
 
         return MockRedisLock(self, key)
 
-    def pipeline(self):
+    def pipeline(self, transaction=True):
         """Emulate a redis-python pipeline."""
         if self.pipe is None:
             self.pipe = MockRedisPipeline(self.redis)
@@ -114,6 +132,8 @@ class MockRedis(object):
     def hgetall(self, hashkey):  # pylint: disable=R0201
         """Emulate hgetall."""
 
+        if not isinstance(self.redis[hashkey], dict):
+            raise ResponseError(WRONGTYPE)
         return self.redis[hashkey]
 
     def hlen(self, hashkey):  # pylint: disable=R0201
@@ -128,10 +148,20 @@ class MockRedis(object):
         for attributekey, attributevalue in value.items():
             self.redis[hashkey][attributekey] = attributevalue
 
-    def hset(self, hashkey, attribute, value):  # pylint: disable=R0201
+    def hmget(self, hashkey, attributes):  # pylint: disable=R0201
+        """Emulate hmget."""
+
+        if not isinstance(self.redis[hashkey], dict):
+            raise ResponseError(WRONGTYPE)
+        return [self.redis[hashkey].get(attribute) for attribute in attributes]
+
+    def hset(self, hashkey, attribute=None, value=None, mapping=None):  # pylint: disable=R0201
         """Emulate hset."""
 
-        self.redis[hashkey][attribute] = value
+        if attribute is not None:
+            self.redis[hashkey][attribute] = value
+        for attributekey, attributevalue in (mapping or {}).items():
+            self.redis[hashkey][attributekey] = attributevalue
 
     def lrange(self, key, start, stop):
         """Emulate lrange."""
@@ -189,6 +219,32 @@ class MockRedis(object):
         self.redis.clear()
 
 
+class MockRedisNode(MockRedis):
+    """Imitate one node of a multi-node cache. Unlike MockRedis, every node has its own
+    store; a replica node is built on its primary's store so it sees the primary's writes."""
+
+    def __init__(self, store=None):
+        """Initialize the object."""
+        self.redis = defaultdict(dict) if store is None else store
+        self.pipe = None
+
+
+class MockRedisNodes(dict):
+    """RedisCache client_factory standing in a separate MockRedisNode for every host it is
+    asked for. replica_of maps a replica host to its primary, whose store it shares. The nodes
+    built so far are kept by host."""
+
+    def __init__(self, replica_of=None):
+        super(MockRedisNodes, self).__init__()
+        self._replica_of = replica_of or {}
+
+    def __call__(self, host):
+        if host not in self:
+            primary = self._replica_of.get(host)
+            self[host] = MockRedisNode(self(primary).redis if primary else None)
+        return self[host]
+
+
 def mock_redis_client():
     """Mock common.util.redis_client so we can return a MockRedis object
     instead of a Redis object."""
@@ -0,0 +1,90 @@
+import json
+from unittest import TestCase
+
+from celery import Celery
+from kombu.exceptions import OperationalError
+from mock import MagicMock, patch
+
+from service.cache.redis_cache import RedisCache
+from service.outbox import (OUTBOX_DEAD_LETTER_STREAM, OUTBOX_GROUP,
+                            OUTBOX_STREAM, TaskOutbox)
+
+
+class TestTaskOutbox(TestCase):
+
+    def setUp(self):
+        self._client = MagicMock()
+        cache = RedisCache('localhost', client_factory=lambda host: self._client)
+        self._outbox = TaskOutbox(cache, reclaim_after_ms=1000)
+
+    def test_enqueue_spools_task(self):
+        task_id = self._outbox.enqueue('scan.request', {'uri': 'https://localhost.com'})
+        self._client.xadd.assert_called_once_with(OUTBOX_STREAM, {
+            'route': 'scan.request',
+            'task_id': task_id,
+            'payload': json.dumps({'uri': 'https://localhost.com'})
+        }, maxlen=100000, approximate=True)
+
+    def test_enqueue_failure(self):
+        self._client.xadd.side_effect = ConnectionError
+        self.assertIsNone(self._outbox.enqueue('scan.request', {}))
+
+    @patch.object(Celery, 'send_task')
+    def test_publish_batch_acks_confirmed_entries(self, send_task_method):
+        send_task_method.side_effect = [None, KeyError]
+        entries = [
+            (b'1-0', {b'route': b'scan.request', b'task_id': b'abc', b'payload': b'{"uri": "https://a.com"}'}),
+            (b'2-0', {b'route': b'classify.request', b'task_id': b'def', b'payload': b'{}'})
+        ]
+        self.assertEqual(self._outbox.publish_batch(entries), 1)
+        self.assertEqual(send_task_method.call_args_list[0][0], ('scan.request',))
+        self.assertEqual(send_task_method.call_args_list[0][1]['args'], ({'uri': 'https://a.com'},))
+        self.assertEqual(send_task_method.call_args_list[0][1]['task_id'], 'abc')
+        self._client.xack.assert_called_once_with(OUTBOX_STREAM, OUTBOX_GROUP, b'1-0')
+        self._client.xdel.assert_called_once_with(OUTBOX_STREAM, b'1-0')
+
+    @patch.object(Celery, 'send_task')
+    def test_publish_batch_stops_on_broker_outage(self, send_task_method):
+        send_task_method.side_effect = [None, OperationalError, None]
+        entries = [(entry_id, {b'route': b'scan.request', b'task_id': entry_id, b'payload': b'{}'})
+                   for entry_id in (b'1-0', b'2-0', b'3-0')]
+        self.assertRaises(OperationalError, self._outbox.publish_batch, entries)
+        self.assertEqual(send_task_method.call_count, 2)
+        self._client.xack.assert_called_once_with(OUTBOX_STREAM, OUTBOX_GROUP, b'1-0')
+
+    def test_claims_only_stale_entries(self):
+        self._client.xpending_range.return_value = [
+            dict(message_id=b'1-0', time_since_delivered=5000, times_delivered=1),
+            dict(message_id=b'2-0', time_since_delivered=10, times_delivered=1)
+        ]
+        self._outbox._claim_stale()
+        self.assertEqual(self._client.xclaim.call_args[0][4], [b'1-0'])
+
+    def test_exhausted_entries_are_dead_lettered(self):
+        self._client.xpending_range.return_value = [
+            dict(message_id=b'1-0', time_since_delivered=5000, times_delivered=5),
+            dict(message_id=b'2-0', time_since_delivered=5000, times_delivered=2)
+        ]
+        self._client.xrange.return_value = [(b'1-0', {b'route': b'scan.request', b'payload': b'not json'})]
+        self._outbox._claim_stale()
+        self._client.xadd.assert_called_once_with(OUTBOX_DEAD_LETTER_STREAM, {b'route': b'scan.request', b'payload': b'not json'},
+                                                  maxlen=100000, approximate=True)
+        self._client.xack.assert_called_once_with(OUTBOX_STREAM, OUTBOX_GROUP, b'1-0')
+        self.assertEqual(self._client.xclaim.call_args[0][4], [b'2-0'])
+
+    def test_drain_publishes_new_entries(self):
+        self._client.xpending_range.return_value = []
+        self._client.xreadgroup.return_value = [(OUTBOX_STREAM, [(b'1-0', {})])]
+        self._outbox.publish_batch = MagicMock(return_value=1)
+        self.assertEqual(self._outbox.drain(), 1)
+        self._outbox.publish_batch.assert_called_once_with([(b'1-0', {})])
+        self._outbox.drain()
+        self._client.xgroup_create.assert_called_once()
+
+    def test_check_durable(self):
+        self._client.config_get.return_value = {'appendonly': 'yes'}
+        self._outbox.check_durable()
+        self._client.config_get.return_value = {'appendonly': 'no'}
+        self.assertRaises(RuntimeError, self._outbox.check_durable)
+        self._client.config_get.side_effect = ConnectionError
+        self.assertRaises(RuntimeError, self._outbox.check_durable)
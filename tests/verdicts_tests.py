@@ -0,0 +1,52 @@
+from unittest import TestCase
+
+from mock import patch
+
+from service.cache.redis_cache import RedisCache
+from service.rest.verdicts import VerdictStore, parse_rules
+from tests.mock_redis import MockRedisNodes
+
+
+class TestVerdictStore(TestCase):
+
+    def setUp(self):
+        self._cache = RedisCache('cache-0,cache-1', client_factory=MockRedisNodes())
+
+    def test_parse_rules(self):
+        self.assertEqual(parse_rules('scan:classify, classify:scan'), [('scan', 'classify'), ('classify', 'scan')])
+        self.assertEqual(parse_rules('scan:scan,bogus,scan:other,'), [])
+        self.assertEqual(parse_rules(None), [])
+
+    def test_reuse_allowed_by_rule(self):
+        verdicts = VerdictStore(self._cache, 'scan:classify')
+        verdicts.record('scan', 'https://a.com', 'scan_id', dict(status='SUCCESS', uri='https://a.com', confidence=0.4))
+        source, verdict = verdicts.find('classify', 'https://a.com')
+        self.assertEqual((source, verdict['id']), ('scan', 'scan_id'))
+        self.assertIsNone(verdicts.find('scan', 'https://a.com'))
+        self.assertIsNone(verdicts.find('classify', 'https://b.com'))
+        self.assertEqual(verdicts.reused_counts(), {'scan:classify': 1})
+
+    def test_only_response_fields_are_kept(self):
+        verdicts = VerdictStore(self._cache, 'scan:classify')
+        verdicts.record('scan', 'https://f.com', 'scan_id', dict(status='SUCCESS', confidence=0.7, pages=['https://f.com/a']))
+        _, verdict = verdicts.find('classify', 'https://f.com')
+        self.assertEqual(verdict['result'], {'confidence': 0.7})
+
+    def test_verdict_without_confidence_does_not_answer_classification(self):
+        verdicts = VerdictStore(self._cache, 'scan:classify')
+        verdicts.record('scan', 'https://g.com', 'scan_id', dict(status='SUCCESS'))
+        self.assertIsNone(verdicts.find('classify', 'https://g.com'))
+        self.assertEqual(verdicts.reused_counts(), {'scan:classify': 0})
+
+    def test_no_rules_records_nothing(self):
+        verdicts = VerdictStore(self._cache, '')
+        verdicts.record('scan', 'https://c.com', 'scan_id', dict(status='SUCCESS'))
+        self.assertEqual(self._cache.get_fields('verdict:https://c.com'), {})
+
+    def test_failed_or_stale_verdicts_are_not_reused(self):
+        verdicts = VerdictStore(self._cache, 'classify:scan', max_age=60)
+        verdicts.record('classify', 'https://d.com', 'failed_id', dict(status='FAILURE'))
+        self.assertIsNone(verdicts.find('scan', 'https://d.com'))
+        with patch('service.rest.verdicts.time.time', return_value=0):
+            verdicts.record('classify', 'https://e.com', 'old_id', dict(status='SUCCESS'))
+        self.assertIsNone(verdicts.find('scan', 'https://e.com'))